@@ -1,2 +1,2 @@
-__all__ = ['parser']
+__all__ = ['parser', 'pool', 'scheduler']
 __version__ = '0.1'
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""Потоковый конвейер: сбор -> дедупликация -> проверка -> NDJSON
+
+    python -m proxy_parser -s proxyscrape -t socks5 | head -n 50
+
+Каждый проверенный прокси-сервер выводится отдельной JSON строкой сразу
+после проверки, не дожидаясь остальных источников.
+"""
+from .common import Proxy, ProxyTpe
+from typing import List, Dict, Tuple
+import argparse
+import threading
+import sys
+import os
+
+SOURCES: Dict[str, Tuple[str, dict]] = {
+    'free-proxy-cz': ('FreeProxyCzParser', {'pages': [1]}),
+    'free-proxy-list': ('FreeProxyListNetParser', {}),
+    'spys-one': ('SpysOneParser', {}),
+    'proxyscrape': ('ProxyScrapeParser', {}),
+    'proxy-list-download': ('ProxyListDownloadParser', {}),
+}
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser(
+        prog='python -m proxy_parser',
+        description='Сбор, проверка и вывод прокси-серверов в формате NDJSON')
+    arg_parser.add_argument('-s', '--source', action='append', choices=list(SOURCES),
+        help='источник прокси-серверов (можно указать несколько, по умолчанию все)')
+    arg_parser.add_argument('-t', '--type', choices=[str(item) for item in ProxyTpe],
+        help='тип прокси-серверов')
+    arg_parser.add_argument('--timeout', type=float, default=1,
+        help='таймаут проверки соединения, секунд (по умолчанию 1)')
+    arg_parser.add_argument('-c', '--concurrency', type=int, default=100,
+        help='число одновременных проверок (по умолчанию 100)')
+    arg_parser.add_argument('--no-check', action='store_true',
+        help='выводить прокси-серверы без проверки')
+
+    return arg_parser.parse_args(argv)
+
+async def run(args: argparse.Namespace, output) -> int:
+    """Запуск конвейера, возвращает число выведенных прокси-серверов"""
+    import asyncio
+    import json
+    from . import parser
+    from .scheduler import ProxySource
+
+    loop = asyncio.get_running_loop()
+    source_names: List[str] = args.source or list(SOURCES)
+    proxy_type: ProxyTpe = ProxyTpe.find(args.type) if args.type else None
+    harvested: asyncio.Queue = asyncio.Queue()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    seen: set = set()
+    emitted: List[int] = [0]
+
+    def harvest(name: str):
+        # Парсеры блокирующие, каждый источник собирается в своем потоке
+        class_name, kwargs = SOURCES[name]
+        source: ProxySource = ProxySource(getattr(parser, class_name), name=name, **kwargs)
+        diff = source.run()
+        try:
+            loop.call_soon_threadsafe(harvested.put_nowait, (source, diff))
+        except RuntimeError:
+            pass
+
+    async def produce():
+        for name in source_names:
+            threading.Thread(target=harvest, args=(name,), daemon=True).start()
+
+        for _ in source_names:
+            source, diff = await harvested.get()
+            if diff is None:
+                print('%s: %s' % (source.name, source.last_error), file=sys.stderr)
+                continue
+
+            for proxy in diff.added:
+                key: str = proxy.get_key()
+                if proxy.type is None or key in seen:
+                    continue
+                if proxy_type is not None and proxy.type != proxy_type:
+                    continue
+
+                seen.add(key)
+                await queue.put(proxy)
+
+        await queue.join()
+
+    def emit(proxy: Proxy):
+        item: dict = proxy.to_dict()
+        item['latency'] = proxy.checked_latency
+        output.write(json.dumps(item, default=str) + '\n')
+        output.flush()
+        emitted[0] += 1
+
+    async def check():
+        while True:
+            proxy: Proxy = await queue.get()
+            try:
+                if args.no_check:
+                    emit(proxy)
+                    continue
+
+                await proxy.check(args.timeout)
+                if proxy.in_timeout(args.timeout):
+                    emit(proxy)
+            finally:
+                queue.task_done()
+
+    tasks: list = [asyncio.ensure_future(produce())]
+    tasks += [asyncio.ensure_future(check()) for _ in range(max(args.concurrency, 1))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return emitted[0]
+
+def main(argv: List[str] = None) -> int:
+    args: argparse.Namespace = parse_args(argv)
+    import asyncio
+    try:
+        asyncio.run(run(args, sys.stdout))
+    except BrokenPipeError:
+        # Получатель (например, head) закрыл вывод раньше времени
+        devnull: int = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
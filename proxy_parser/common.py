@@ -1,18 +1,14 @@
-from urllib import request
-from urllib.parse import urlencode
-from urllib.error import HTTPError, URLError
-from http.client import HTTPResponse
+from urllib.parse import urlencode, urlsplit
 from html.parser import HTMLParser
 from typing import List, Tuple, Dict, Union
 from datetime import datetime, timedelta
 from enum import Enum, unique
+from collections import deque
+import threading
 import socket
-import pickle
-import hashlib
+import struct
+import time
 import os
-import csv
-import json
-import asyncio
 
 __all__ = ['Proxy', 'ProxyList']
 
@@ -44,6 +40,7 @@ class CacheManager():
 
     def save(self, data, key: str, time_diff: timedelta):
         """Сохраняем кеш"""
+        import pickle
         cached_data: dict = {
             'data': data,
             'key': key,
@@ -60,6 +57,7 @@ class CacheManager():
 
     def get(self, key: str):
         """Запрашиваем данные по ключу"""
+        import pickle
         data = None
         if not self.check(key): 
             return None
@@ -73,6 +71,7 @@ class CacheManager():
 
     def check(self, key: str) -> bool:
         """Проверяем наличие актуального кеша"""
+        import pickle
         is_success: bool = False
         file_path: str = self.__get_cache_file(key)
         if not os.path.isfile(file_path): 
@@ -147,7 +146,8 @@ class HttpClient():
 
         return result
 
-    def __internal_http_request(self, req: request.Request, cache_key: str, timeout: float = None):
+    def __internal_http_request(self, req, cache_key: str, timeout: float = None):
+        from urllib import request
         if not timeout:
             timeout = socket._GLOBAL_DEFAULT_TIMEOUT
         with request.urlopen(req, timeout=timeout) as resp:
@@ -166,6 +166,8 @@ class HttpClient():
         return None
 
     def _get_cache_key(self, url: str, method: str, data = None, headers: Dict[str, str] = {}) -> str:
+        import hashlib
+        import pickle
         return hashlib.md5(pickle.dumps({
             'url': url,
             'method': method,
@@ -186,6 +188,8 @@ class HttpClient():
 
     def http_request(self, url: str, method: str, data = None, headers: Dict[str, str] = {}, timeout: float = None) -> HttpRequestResult:
         """HTTP запрос"""
+        from urllib import request
+        from urllib.error import HTTPError, URLError
         cache_key = self._get_cache_key(url, method, data, headers)
         if data:
             data = urlencode(data).encode('ascii')
@@ -221,6 +225,17 @@ class HttpClient():
         """HTTP DELETE запрос"""
         return self.http_request(url, 'DELETE', data, headers, timeout)
 
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Чтение из сокета ровно size байт"""
+    data: bytes = b''
+    while len(data) < size:
+        chunk: bytes = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Прокси-сервер закрыл соединение')
+        data += chunk
+
+    return data
+
 class Proxy(HttpClient):
     fields: List[str] = [
         'type',
@@ -251,6 +266,11 @@ class Proxy(HttpClient):
         self.__time_add: datetime = time_add 
         self.__time_check: datetime = time_check
         self.__time_use: datetime = None
+        self.fail_count: int = 0
+        self.latency_history: deque = deque(maxlen=32)
+        self.__connection: HTTPConnection = None
+        self.__connection_key: tuple = None
+        self.__lock: threading.Lock = threading.Lock()
 
     def __str__(self) -> str:
         credential_str: str = ''
@@ -264,6 +284,10 @@ class Proxy(HttpClient):
     def get_host(self) -> str:
         return '%s:%s' % (self.addr, self.port)
 
+    def get_key(self) -> str:
+        """Ключ прокси-сервера без учетных данных"""
+        return '%s://%s' % (self.type, self.get_host())
+
     @property
     def time_add(self) -> datetime:
         return self.__time_add
@@ -271,19 +295,205 @@ class Proxy(HttpClient):
     @property
     def time_check(self) -> datetime:
         """Время проверки прокси-сервера"""
-        return self.__time_ckeck
+        return self.__time_check
+
+    @property
+    def checked_latency(self) -> float:
+        """Время установки соединения при последней проверке, 0 если недоступен"""
+        return self.__checked_latency
 
     async def check(self, timeout_sec: float = 1):
         """Проверка соединения с прокси-сервером"""
+        import asyncio
         try:
             self.__time_check = datetime.now()
+            time_start: float = time.monotonic()
             conn = asyncio.open_connection(self.addr, self.port)
-            await asyncio.wait_for(conn, timeout=timeout_sec)
-            conn.close()
-            self.__checked_latency = timeout_sec
+            _, writer = await asyncio.wait_for(conn, timeout=timeout_sec)
+            self.__checked_latency = max(time.monotonic() - time_start, 1e-6)
+            writer.close()
         except (asyncio.TimeoutError, ConnectionRefusedError, OSError):
             self.__checked_latency = 0
 
+    def is_socks(self) -> bool:
+        return self.type in (ProxyTpe.SOCKS4, ProxyTpe.SOCKS5)
+
+    def open_socket(self, host: str, port: int, timeout: float = None) -> socket.socket:
+        """Установка соединения с целевым хостом через SOCKS прокси-сервер"""
+        if not timeout:
+            timeout = socket._GLOBAL_DEFAULT_TIMEOUT
+        sock: socket.socket = socket.create_connection((self.addr, self.port), timeout)
+        try:
+            if self.type == ProxyTpe.SOCKS4:
+                self.__socks4_handshake(sock, host, port)
+            else:
+                self.__socks5_handshake(sock, host, port)
+        except Exception:
+            sock.close()
+            raise
+
+        return sock
+
+    def __socks4_handshake(self, sock: socket.socket, host: str, port: int):
+        addr: bytes = socket.inet_aton(socket.gethostbyname(host))
+        user_id: bytes = (self.login or '').encode('utf-8')
+        sock.sendall(struct.pack('>BBH', 4, 1, port) + addr + user_id + b'\x00')
+        reply: bytes = _recv_exact(sock, 8)
+        if reply[1] != 0x5a:
+            raise ConnectionError('SOCKS4 прокси-сервер отклонил запрос (код %s)' % reply[1])
+
+    def __socks5_handshake(self, sock: socket.socket, host: str, port: int):
+        methods: bytes = b'\x00\x02' if self.login is not None else b'\x00'
+        sock.sendall(bytes([5, len(methods)]) + methods)
+        version, method = _recv_exact(sock, 2)
+        if version != 5 or method not in methods:
+            raise ConnectionError('SOCKS5 прокси-сервер не поддерживает метод авторизации')
+
+        if method == 2:
+            login: bytes = self.login.encode('utf-8')
+            password: bytes = (self.password or '').encode('utf-8')
+            sock.sendall(bytes([1, len(login)]) + login + bytes([len(password)]) + password)
+            if _recv_exact(sock, 2)[1] != 0:
+                raise ConnectionError('SOCKS5 прокси-сервер отклонил логин и пароль')
+
+        host_bytes: bytes = host.encode('idna')
+        sock.sendall(bytes([5, 1, 0, 3, len(host_bytes)]) + host_bytes + struct.pack('>H', port))
+        version, reply, _, addr_type = _recv_exact(sock, 4)
+        if reply != 0:
+            raise ConnectionError('SOCKS5 прокси-сервер отклонил запрос (код %s)' % reply)
+
+        if addr_type == 1:
+            addr_size: int = 4
+        elif addr_type == 4:
+            addr_size: int = 16
+        else:
+            addr_size: int = _recv_exact(sock, 1)[0]
+        _recv_exact(sock, addr_size + 2)
+
+    def _proxy_auth_headers(self) -> Dict[str, str]:
+        if self.login is None:
+            return {}
+
+        import base64
+
+        credential: bytes = ('%s:%s' % (self.login, self.password or '')).encode('utf-8')
+        return {'Proxy-Authorization': 'Basic %s' % base64.b64encode(credential).decode('ascii')}
+
+    def __get_connection(self, scheme: str, host: str, port: int, timeout: float) -> tuple:
+        """Соединение из пула (одно на прокси-сервер)"""
+        from http.client import HTTPConnection, HTTPSConnection
+        from .connection import SocksHTTPConnection, SocksHTTPSConnection
+        if self.is_socks() or scheme == 'https':
+            key: tuple = (scheme, host, port)
+        else:
+            # HTTP прокси-сервер принимает абсолютные URL, соединение не зависит от хоста
+            key: tuple = (scheme,)
+
+        if self.__connection is not None and self.__connection_key == key:
+            self.__connection.timeout = timeout
+            if self.__connection.sock is not None and timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                self.__connection.sock.settimeout(timeout)
+            return self.__connection, True
+
+        self.close()
+        if self.type is None:
+            raise ValueError('Неизвестный тип прокси-сервера')
+        elif self.is_socks() and scheme == 'https':
+            connection = SocksHTTPSConnection(self, host, port, timeout=timeout)
+        elif self.is_socks():
+            connection = SocksHTTPConnection(self, host, port, timeout=timeout)
+        elif scheme == 'https':
+            connection = HTTPSConnection(self.addr, self.port, timeout=timeout)
+            connection.set_tunnel(host, port, headers=self._proxy_auth_headers())
+        else:
+            connection = HTTPConnection(self.addr, self.port, timeout=timeout)
+
+        self.__connection = connection
+        self.__connection_key = key
+        return connection, False
+
+    def __send_request(self, url: str, method: str, data, headers: Dict[str, str], timeout: float) -> HttpRequestResult:
+        from http.client import RemoteDisconnected
+        url_parts = urlsplit(url)
+        scheme: str = url_parts.scheme.lower()
+        if scheme not in ('http', 'https') or not url_parts.hostname:
+            raise ValueError('Неподдерживаемый URL: %s' % url)
+
+        port: int = url_parts.port or (443 if scheme == 'https' else 80)
+        if self.is_socks() or scheme == 'https':
+            path: str = url_parts.path or '/'
+            if url_parts.query:
+                path = '%s?%s' % (path, url_parts.query)
+        else:
+            path: str = url
+            headers = dict(headers, **self._proxy_auth_headers())
+
+        while True:
+            connection, is_reused = self.__get_connection(scheme, url_parts.hostname, port, timeout)
+            try:
+                connection.request(method, path, body=data, headers=headers)
+                resp: HTTPResponse = connection.getresponse()
+                body: bytes = resp.read()
+            except (RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Соединение из пула могло быть закрыто сервером, пробуем новое
+                self.close()
+                if not is_reused:
+                    raise
+                continue
+
+            if resp.will_close:
+                self.close()
+
+            return HttpRequestResult(
+                    responce=resp,
+                    status=resp.status,
+                    body=body,
+                    headers=resp.headers.items())
+
+    def http_request(self, url: str, method: str, data = None, headers: Dict[str, str] = {}, timeout: float = None) -> HttpRequestResult:
+        """HTTP запрос через прокси-сервер"""
+        from http.client import HTTPException
+        if data:
+            data = urlencode(data).encode('ascii')
+        if not timeout:
+            timeout = socket._GLOBAL_DEFAULT_TIMEOUT
+
+        request_headers: Dict[str, str] = {key: value for key, value in self.headers.items() if key != 'Host'}
+        request_headers.update(headers)
+        request_result: HttpRequestResult = None
+
+        with self.__lock:
+            time_start: float = time.monotonic()
+            try:
+                request_result = self.__send_request(url, method, data, request_headers, timeout)
+            except (HTTPException, OSError, ValueError) as request_error:
+                self.close()
+                request_result = HttpRequestResult(error=request_error)
+
+            self.register_result(request_result.is_success(), time.monotonic() - time_start)
+
+        return request_result
+
+    def register_result(self, is_success: bool, latency: float = None):
+        """Учет задержки и ошибок прокси-сервера"""
+        if not is_success:
+            self.fail_count += 1
+            return
+
+        self.fail_count = 0
+        if latency is None:
+            return
+
+        self.latency_history.append(latency)
+        self.latency = sum(self.latency_history) / len(self.latency_history)
+
+    def close(self):
+        """Закрытие соединения из пула"""
+        if self.__connection is not None:
+            self.__connection.close()
+        self.__connection = None
+        self.__connection_key = None
+
 
     @staticmethod
     def from_dict(data: dict):
@@ -350,6 +560,7 @@ class ProxyList(list):
 
     def load_csv(self, file_name: str):
         """Загрузка списка из csv"""
+        import csv
         with open(file_name, 'r') as f:
             csv_reader = csv.DictReader(f, fieldnames=Proxy.fields, delimiter=';')
             for item in csv_reader:
@@ -361,6 +572,7 @@ class ProxyList(list):
 
     def load_json(self, file_name: str):
         """Загрузка списка из json"""
+        import json
         with open(file_name, 'r') as f:
             json_data: Dict = json.load(f)
             for item in json_data:
@@ -368,6 +580,7 @@ class ProxyList(list):
 
     def dump_csv(self, file_name: str):
         """Сохранение списка в csv"""
+        import csv
         with open(file_name, 'w') as f:
             csv_writer = csv.DictWriter(f, delimiter=';', fieldnames=Proxy.fields)
             for item in self.to_dict():
@@ -375,11 +588,13 @@ class ProxyList(list):
 
     def dump_json(self, file_name: str):
         """Сохранение списка в json"""
+        import json
         with open(file_name, 'w') as f:
             json.dump(self.to_dict(), f)
 
     def check(self, timeout: float = 1):
         """Проверка соединения с прокси-серверами"""
+        import asyncio
         event_loop = asyncio.get_event_loop()
         task_list: list = []
         for proxy in self:
@@ -390,11 +605,82 @@ class ProxyList(list):
 
         return self
 
+    def best(self, count: int = 1):
+        """Прокси-серверы с наименьшим числом ошибок и задержкой"""
+        result: ProxyList = ProxyList(sorted(
+            self,
+            key=lambda proxy: (proxy.fail_count, proxy.latency if proxy.latency > 0 else float('inf'))))
+        result.set_mode(self.mode)
+        return result[:count]
+
+    def latency_percentile(self, percentile: float = 95, min_samples: int = 5) -> float:
+        """Перцентиль задержки запросов через прокси-серверы списка"""
+        samples: List[float] = sorted(latency for proxy in self for latency in proxy.latency_history)
+        if len(samples) < min_samples:
+            return None
+
+        index: int = round(percentile / 100 * (len(samples) - 1))
+        return samples[min(max(index, 0), len(samples) - 1)]
+
+    def fetch(
+            self,
+            url: str,
+            method: str = 'GET',
+            data = None,
+            headers: Dict[str, str] = {},
+            timeout: float = None,
+            hedge: bool = True,
+            hedge_percentile: float = 95,
+            hedge_delay: float = 1) -> HttpRequestResult:
+        """HTTP запрос через лучший прокси-сервер списка
+
+        В режиме hedge, если ответ не получен за hedge_percentile перцентиль
+        задержки (или hedge_delay, пока замеров мало), отправляется резервный
+        запрос через второй прокси-сервер и возвращается первый успешный ответ.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+        proxy_list: ProxyList = self.best(2 if hedge else 1)
+        if not proxy_list:
+            return HttpRequestResult(error=LookupError('Список прокси-серверов пуст'))
+
+        if len(proxy_list) == 1:
+            return proxy_list[0].http_request(url, method, data, headers, timeout)
+
+        delay: float = self.latency_percentile(hedge_percentile)
+        if delay is None:
+            delay = hedge_delay
+
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=2)
+        try:
+            primary, backup = proxy_list
+            futures: list = [executor.submit(primary.http_request, url, method, data, headers, timeout)]
+            done, _ = wait(futures, timeout=delay)
+            if done and futures[0].result().is_success():
+                return futures[0].result()
+
+            futures.append(executor.submit(backup.http_request, url, method, data, headers, timeout))
+            request_result: HttpRequestResult = None
+            for future in as_completed(futures):
+                request_result = future.result()
+                if request_result.is_success():
+                    break
+
+            return request_result
+        finally:
+            # Не дожидаемся отставшего запроса, его соединение останется в пуле
+            executor.shutdown(wait=False)
+
+    def close(self):
+        """Закрытие соединений с прокси-серверами"""
+        for proxy in self:
+            proxy.close()
+
 class CommonProxyParser(HTMLParser):
     headers: Dict[str, str] = {}
+    refresh_interval: timedelta = timedelta(hours=1)
 
     def __init__(self):
-        self.http_client: HttpClient = HttpClient(cache_time_diff=timedelta(hours=1), cache_storage_dir='.cache/')
+        self.http_client: HttpClient = HttpClient(cache_time_diff=self.refresh_interval, cache_storage_dir='.cache/')
         self.proxy_list: ProxyList = ProxyList()
         self.addr = ''
         self.type = ''
@@ -0,0 +1,23 @@
+from http.client import HTTPConnection, HTTPSConnection
+import socket
+
+__all__ = ['SocksHTTPConnection', 'SocksHTTPSConnection']
+
+class SocksHTTPConnection(HTTPConnection):
+    """HTTP соединение с целевым хостом через SOCKS прокси-сервер"""
+    def __init__(self, proxy, host: str, port: int = None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.proxy = proxy
+
+    def connect(self):
+        self.sock = self.proxy.open_socket(self.host, self.port, self.timeout)
+
+class SocksHTTPSConnection(HTTPSConnection):
+    """HTTPS соединение с целевым хостом через SOCKS прокси-сервер"""
+    def __init__(self, proxy, host: str, port: int = None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.proxy = proxy
+
+    def connect(self):
+        sock: socket.socket = self.proxy.open_socket(self.host, self.port, self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
@@ -1,8 +1,6 @@
 from .common import CommonProxyParser, Proxy, ProxyList, ProxyTpe
 from typing import List, Tuple, Dict
 from enum import Enum, Flag, unique, auto
-import base64
-import json
 
 @unique
 class FreeProxyCzSort(Enum):
@@ -83,6 +81,7 @@ class FreeProxyCzParser(CommonProxyParser):
             return
 
         if 'document.write(Base64.decode("' in data:
+            import base64
             enc_addr: str = data.replace('document.write(Base64.decode("', '').replace('"))', '').encode('ascii')
             self.addr = base64.decodebytes(enc_addr).decode('ascii')
             self.new_proxy = True
@@ -284,6 +283,7 @@ class ProxyListDownloadParser(CommonProxyParser):
     url: str = 'https://www.proxy-list.download/api/v0/get?l=en&t=%s'
 
     def __init__(self, protocol: ProxyListDownloadType = ProxyListDownloadType.ALL):
+        import json
         self.parse_textarea_list: bool = False
         super().__init__()
         self.headers['Host'] = 'www.proxy-list.download'
@@ -0,0 +1,352 @@
+from .common import Proxy, ProxyList, ProxyTpe
+from typing import List, Tuple, Dict, Union, Callable
+import socketserver
+import threading
+import itertools
+import socket
+import json
+import time
+import os
+
+__all__ = ['ProxyPoolServer', 'ProxyPoolClient', 'ProxyLease']
+
+Address = Union[str, Tuple[str, int]]
+
+def _dumps(message: dict) -> bytes:
+    return (json.dumps(message, default=str) + '\n').encode('utf-8')
+
+class _ProxyPoolHandler(socketserver.StreamRequestHandler):
+    """Обработка команд одного клиента (JSON, по строке на сообщение)"""
+    def setup(self):
+        super().setup()
+        if self.request.family != getattr(socket, 'AF_UNIX', None):
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.write_lock: threading.Lock = threading.Lock()
+
+    def send(self, message: dict):
+        with self.write_lock:
+            self.wfile.write(_dumps(message))
+            self.wfile.flush()
+
+    def handle(self):
+        pool: ProxyPoolServer = self.server.pool
+        for line in self.rfile:
+            try:
+                command: dict = json.loads(line)
+                response: dict = pool.execute(command, self)
+            except (ValueError, KeyError, TypeError) as error:
+                response: dict = {'ok': False, 'error': str(error)}
+
+            self.send(response)
+
+    def finish(self):
+        self.server.pool.unsubscribe(self)
+        super().finish()
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _ThreadingUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+class ProxyPoolServer():
+    """Общий пул прокси-серверов для нескольких процессов
+
+    Сервер владеет одним проверенным ProxyList и выдает прокси-серверы
+    в аренду (lease) на ttl секунд. Клиенты возвращают аренду с результатом
+    и задержкой запроса, подписчики получают события add/remove.
+    """
+    def __init__(
+            self,
+            proxy_list: ProxyList,
+            address: Address = ('127.0.0.1', 8765),
+            max_leases: int = 1,
+            max_fails: int = 3,
+            default_ttl: float = 60):
+        self.address: Address = address
+        self.max_leases: int = max_leases
+        self.max_fails: int = max_fails
+        self.default_ttl: float = default_ttl
+        self.__lock: threading.RLock = threading.RLock()
+        self.__proxies: Dict[str, Proxy] = {}
+        self.__leases: Dict[str, Tuple[str, float]] = {}
+        self.__lease_counts: Dict[str, int] = {}
+        self.__lease_ids = itertools.count(1)
+        self.__subscribers: List[_ProxyPoolHandler] = []
+        self.__server: socketserver.BaseServer = None
+        self.__thread: threading.Thread = None
+        for proxy in proxy_list:
+            self.__proxies[proxy.get_key()] = proxy
+
+    @property
+    def proxy_list(self) -> ProxyList:
+        with self.__lock:
+            return ProxyList(self.__proxies.values())
+
+    def __create_server(self) -> socketserver.BaseServer:
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            server = _ThreadingUnixServer(self.address, _ProxyPoolHandler)
+        else:
+            server = _ThreadingTCPServer(self.address, _ProxyPoolHandler)
+            self.address = server.server_address
+
+        server.pool = self
+        return server
+
+    def serve_forever(self):
+        """Запуск сервера в текущем потоке"""
+        self.__server = self.__create_server()
+        self.__server.serve_forever()
+
+    def start(self):
+        """Запуск сервера в фоновом потоке"""
+        self.__server = self.__create_server()
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def shutdown(self):
+        """Остановка сервера"""
+        if self.__server is None:
+            return
+
+        self.__server.shutdown()
+        self.__server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        self.__server = None
+
+    def add(self, proxy_list: ProxyList):
+        """Добавление прокси-серверов в пул"""
+        with self.__lock:
+            for proxy in proxy_list:
+                key: str = proxy.get_key()
+                if key in self.__proxies:
+                    continue
+
+                self.__proxies[key] = proxy
+                self.__publish('add', proxy)
+
+    def remove(self, proxy_list: ProxyList):
+        """Удаление прокси-серверов из пула"""
+        with self.__lock:
+            for proxy in proxy_list:
+                self.__remove(proxy.get_key())
+
+    def __remove(self, key: str):
+        proxy: Proxy = self.__proxies.pop(key, None)
+        if proxy is None:
+            return
+
+        self.__lease_counts.pop(key, None)
+        for lease_id in [lease_id for lease_id, (lease_key, _) in self.__leases.items() if lease_key == key]:
+            del self.__leases[lease_id]
+        self.__publish('remove', proxy)
+
+    def __expire_leases(self):
+        now: float = time.monotonic()
+        for lease_id in [lease_id for lease_id, (_, time_exp) in self.__leases.items() if time_exp <= now]:
+            self.__release(lease_id)
+
+    def __release(self, lease_id: str) -> str:
+        key, _ = self.__leases.pop(lease_id)
+        if key in self.__lease_counts:
+            self.__lease_counts[key] -= 1
+        return key
+
+    def lease(self, ttl: float = None, proxy_type: ProxyTpe = None) -> Tuple[str, Proxy]:
+        """Аренда лучшего свободного прокси-сервера"""
+        with self.__lock:
+            self.__expire_leases()
+            candidates: ProxyList = ProxyList(
+                proxy for key, proxy in self.__proxies.items()
+                if self.__lease_counts.get(key, 0) < self.max_leases
+                and (proxy_type is None or proxy.type == proxy_type))
+            if not candidates:
+                return None, None
+
+            proxy: Proxy = candidates.best()[0]
+            key: str = proxy.get_key()
+            lease_id: str = str(next(self.__lease_ids))
+            self.__leases[lease_id] = (key, time.monotonic() + (ttl or self.default_ttl))
+            self.__lease_counts[key] = self.__lease_counts.get(key, 0) + 1
+
+            return lease_id, proxy
+
+    def release(self, lease_id: str, is_success: bool = True, latency: float = None):
+        """Возврат прокси-сервера с результатом использования"""
+        with self.__lock:
+            if lease_id not in self.__leases:
+                return
+
+            key: str = self.__release(lease_id)
+            proxy: Proxy = self.__proxies.get(key, None)
+            if proxy is None:
+                return
+
+            proxy.register_result(is_success, latency)
+            if proxy.fail_count >= self.max_fails:
+                self.__remove(key)
+
+    def subscribe(self, handler: _ProxyPoolHandler):
+        with self.__lock:
+            self.__subscribers.append(handler)
+
+    def unsubscribe(self, handler: _ProxyPoolHandler):
+        with self.__lock:
+            if handler in self.__subscribers:
+                self.__subscribers.remove(handler)
+
+    def __publish(self, event: str, proxy: Proxy):
+        message: dict = {'event': event, 'proxy': proxy.to_dict()}
+        for handler in list(self.__subscribers):
+            try:
+                handler.send(message)
+            except OSError:
+                self.__subscribers.remove(handler)
+
+    def execute(self, command: dict, handler: _ProxyPoolHandler = None) -> dict:
+        """Выполнение команды клиента"""
+        cmd: str = command['cmd']
+        if cmd == 'lease':
+            proxy_type: ProxyTpe = ProxyTpe.find(command['type']) if command.get('type') else None
+            lease_id, proxy = self.lease(command.get('ttl'), proxy_type)
+            if proxy is None:
+                return {'ok': True, 'lease_id': None, 'proxy': None}
+            return {'ok': True, 'lease_id': lease_id, 'proxy': proxy.to_dict()}
+
+        if cmd == 'release':
+            self.release(command['lease_id'], command.get('success', True), command.get('latency'))
+            return {'ok': True}
+
+        if cmd == 'list':
+            return {'ok': True, 'proxies': self.proxy_list.to_dict()}
+
+        if cmd == 'subscribe':
+            self.subscribe(handler)
+            return {'ok': True}
+
+        raise ValueError('Неизвестная команда: %s' % cmd)
+
+class ProxyLease():
+    """Арендованный прокси-сервер"""
+    def __init__(self, lease_id: str, proxy: Proxy):
+        self.lease_id: str = lease_id
+        self.proxy: Proxy = proxy
+
+    def __str__(self) -> str:
+        return str(self.proxy)
+
+class ProxyPoolClient():
+    """Клиент пула прокси-серверов для рабочих процессов"""
+    def __init__(self, address: Address = ('127.0.0.1', 8765), timeout: float = 5):
+        self.address: Address = address
+        self.timeout: float = timeout
+        self.__lock: threading.Lock = threading.Lock()
+        self.__sock: socket.socket = None
+        self.__rfile = None
+        self.__subscriptions: List[socket.socket] = []
+
+    def __connect(self) -> socket.socket:
+        if isinstance(self.address, str):
+            sock: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+        else:
+            sock: socket.socket = socket.create_connection(self.address, self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        return sock
+
+    def __request(self, command: dict) -> dict:
+        with self.__lock:
+            if self.__sock is None:
+                self.__sock = self.__connect()
+                self.__rfile = self.__sock.makefile('rb')
+
+            try:
+                self.__sock.sendall(_dumps(command))
+                line: bytes = self.__rfile.readline()
+            except OSError:
+                self.__close()
+                raise
+
+            if not line:
+                self.__close()
+                raise ConnectionError('Сервер пула закрыл соединение')
+
+        response: dict = json.loads(line)
+        if not response.get('ok'):
+            raise ValueError(response.get('error'))
+
+        return response
+
+    def lease(self, ttl: float = None, proxy_type: ProxyTpe = None) -> ProxyLease:
+        """Аренда прокси-сервера, None если свободных нет"""
+        command: dict = {'cmd': 'lease', 'ttl': ttl}
+        if proxy_type is not None:
+            command['type'] = str(proxy_type)
+
+        response: dict = self.__request(command)
+        if response['proxy'] is None:
+            return None
+
+        return ProxyLease(response['lease_id'], Proxy.from_dict(response['proxy']))
+
+    def release(self, lease: ProxyLease, is_success: bool = True, latency: float = None):
+        """Возврат прокси-сервера с результатом использования"""
+        self.__request({'cmd': 'release', 'lease_id': lease.lease_id, 'success': is_success, 'latency': latency})
+
+    def proxy_list(self) -> ProxyList:
+        """Текущий список прокси-серверов пула"""
+        result: ProxyList = ProxyList()
+        for item in self.__request({'cmd': 'list'})['proxies']:
+            result.append(Proxy.from_dict(item))
+
+        return result
+
+    def subscribe(self, callback: Callable[[str, Proxy], None]) -> threading.Thread:
+        """Подписка на события add/remove, callback вызывается в фоновом потоке"""
+        sock: socket.socket = self.__connect()
+        sock.sendall(_dumps({'cmd': 'subscribe'}))
+        sock.settimeout(None)
+        rfile = sock.makefile('rb')
+        self.__subscriptions.append(sock)
+
+        def listen():
+            try:
+                for line in rfile:
+                    message: dict = json.loads(line)
+                    if 'event' in message:
+                        callback(message['event'], Proxy.from_dict(message['proxy']))
+            except (OSError, ValueError):
+                pass
+
+        thread: threading.Thread = threading.Thread(target=listen, daemon=True)
+        thread.start()
+        return thread
+
+    def __close(self):
+        if self.__sock is not None:
+            self.__rfile.close()
+            self.__sock.close()
+        self.__sock = None
+        self.__rfile = None
+
+    def close(self):
+        """Закрытие соединений с сервером пула"""
+        with self.__lock:
+            self.__close()
+        for sock in self.__subscriptions:
+            sock.close()
+        self.__subscriptions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
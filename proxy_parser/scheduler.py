@@ -0,0 +1,133 @@
+from .common import CommonProxyParser, Proxy, ProxyList
+from typing import List, Dict, Callable, Type
+from datetime import timedelta
+import threading
+import random
+import time
+
+__all__ = ['ProxySource', 'ProxyDiff', 'SourceScheduler']
+
+class ProxyDiff():
+    """Изменения списка прокси-серверов источника с прошлого запуска"""
+    def __init__(self, source_name: str, added: ProxyList, removed: ProxyList):
+        self.source_name: str = source_name
+        self.added: ProxyList = added
+        self.removed: ProxyList = removed
+
+    def is_empty(self) -> bool:
+        return not self.added and not self.removed
+
+    def __str__(self):
+        return '%s: +%s -%s' % (self.source_name, len(self.added), len(self.removed))
+
+class ProxySource():
+    """Источник прокси-серверов с собственным интервалом обновления"""
+    def __init__(
+            self,
+            parser_class: Type[CommonProxyParser],
+            name: str = None,
+            interval: timedelta = None,
+            jitter: float = 0.1,
+            retry_interval: timedelta = timedelta(minutes=1),
+            max_backoff: timedelta = None,
+            **kwargs):
+        if interval is None:
+            interval = parser_class.refresh_interval
+        elif interval != parser_class.refresh_interval:
+            # Кеш HTTP клиента парсера не должен жить дольше интервала обновления
+            parser_class = type(parser_class.__name__, (parser_class,), {'refresh_interval': interval})
+
+        self.parser_class: Type[CommonProxyParser] = parser_class
+        self.name: str = name or parser_class.__name__
+        self.interval: timedelta = interval
+        self.jitter: float = jitter
+        self.retry_interval: timedelta = retry_interval
+        self.max_backoff: timedelta = max_backoff or interval
+        self.kwargs: dict = kwargs
+        self.failures: int = 0
+        self.last_error: Exception = None
+        self.next_run: float = time.monotonic()
+        self.__proxies: Dict[str, Proxy] = {}
+
+    @property
+    def proxy_list(self) -> ProxyList:
+        """Результат последнего успешного запуска"""
+        return ProxyList(self.__proxies.values())
+
+    def is_due(self, now: float = None) -> bool:
+        return (now or time.monotonic()) >= self.next_run
+
+    def __schedule(self, delay: timedelta):
+        # Сдвигаем запуск только вперед, чтобы не попасть в еще живой кеш
+        seconds: float = delay.total_seconds()
+        self.next_run = time.monotonic() + seconds * (1 + random.uniform(0, self.jitter))
+
+    def run(self) -> ProxyDiff:
+        """Запрос источника, None при ошибке (следующий запуск с backoff)"""
+        try:
+            proxy_list: ProxyList = self.parser_class(**self.kwargs).proxy_list
+            if not proxy_list:
+                raise LookupError('Источник %s вернул пустой список' % self.name)
+        except Exception as error:
+            self.failures += 1
+            self.last_error = error
+            self.__schedule(min(self.retry_interval * 2 ** (self.failures - 1), self.max_backoff))
+            return None
+
+        self.failures = 0
+        self.last_error = None
+        self.__schedule(self.interval)
+
+        proxies: Dict[str, Proxy] = {proxy.get_key(): proxy for proxy in proxy_list}
+        added: ProxyList = ProxyList(proxy for key, proxy in proxies.items() if key not in self.__proxies)
+        removed: ProxyList = ProxyList(proxy for key, proxy in self.__proxies.items() if key not in proxies)
+        self.__proxies = proxies
+
+        return ProxyDiff(self.name, added, removed)
+
+class SourceScheduler():
+    """Реестр источников прокси-серверов и планировщик их обновления"""
+    def __init__(self):
+        self.sources: Dict[str, ProxySource] = {}
+
+    def register(self, parser_class: Type[CommonProxyParser], **kwargs) -> ProxySource:
+        """Регистрация источника, kwargs передаются в ProxySource"""
+        source: ProxySource = ProxySource(parser_class, **kwargs)
+        self.sources[source.name] = source
+        return source
+
+    def unregister(self, name: str):
+        self.sources.pop(name, None)
+
+    def next_run_in(self) -> float:
+        """Секунд до ближайшего запуска"""
+        if not self.sources:
+            return None
+
+        return max(0, min(source.next_run for source in self.sources.values()) - time.monotonic())
+
+    def run_pending(self) -> List[ProxyDiff]:
+        """Запуск источников, у которых подошло время обновления"""
+        now: float = time.monotonic()
+        result: List[ProxyDiff] = []
+        for source in list(self.sources.values()):
+            if not source.is_due(now):
+                continue
+
+            diff: ProxyDiff = source.run()
+            if diff is not None:
+                result.append(diff)
+
+        return result
+
+    def run_forever(self, callback: Callable[[ProxyDiff], None], stop_event: threading.Event = None):
+        """Цикл обновления, callback получает изменения каждого запуска"""
+        if stop_event is None:
+            stop_event = threading.Event()
+
+        while not stop_event.is_set():
+            for diff in self.run_pending():
+                callback(diff)
+
+            delay: float = self.next_run_in()
+            stop_event.wait(60 if delay is None else delay)